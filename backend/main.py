@@ -1,28 +1,53 @@
 import asyncio
+import functools
 import json
+import locale
 import os
 import re
 import sys
-import glob
 import shutil
 import subprocess
 import tempfile
+import threading
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
 import anthropic
+import orjson
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from templates import catalog
+try:
+    import httpx2 as httpx  # transport used by anthropic>=1.x
+except ImportError:
+    import httpx
+
+from templates import get_catalog, peek_catalog
 
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
-app = FastAPI()
+
+class OrjsonResponse(JSONResponse):
+    """JSON response serialized with orjson instead of the stdlib json module."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Parse the template notebooks in the background so the server can accept
+    # requests (e.g. /api/load) while the catalog warms up.
+    threading.Thread(target=get_static_system_prompt, daemon=True).start()
+    yield
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=OrjsonResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -73,22 +98,33 @@ class GeneratedScene(Scene):
 # LaTeX detection
 # ---------------------------------------------------------------------------
 
-def detect_latex() -> bool:
-    """Check if pdflatex/xelatex is available for MathTex rendering."""
-    search_paths = [
-        "/opt/homebrew/bin",
-        "/usr/local/bin",
-        "/Library/TeX/texbin",
-    ]
+LATEX_SEARCH_PATHS = (
+    "/opt/homebrew/bin",
+    "/usr/local/bin",
+    "/Library/TeX/texbin",
+)
+
+
+def scan_for_latex(which=shutil.which, exists=os.path.exists) -> bool:
+    """Look for pdflatex/xelatex/latex on PATH and in common TeX locations.
+
+    ``which`` and ``exists`` can be swapped out to test without touching the
+    filesystem.
+    """
     for cmd in ("pdflatex", "xelatex", "latex"):
-        if shutil.which(cmd):
+        if which(cmd):
             return True
-        for p in search_paths:
-            if (Path(p) / cmd).exists():
+        for p in LATEX_SEARCH_PATHS:
+            if exists(os.path.join(p, cmd)):
                 return True
     return False
 
 
+def detect_latex() -> bool:
+    """Check if pdflatex/xelatex is available for MathTex rendering."""
+    return scan_for_latex()
+
+
 LATEX_AVAILABLE = detect_latex()
 
 
@@ -100,6 +136,120 @@ def ensure_project_dir():
     PROJECT_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def write_bytes_atomic(path: Path, data: bytes):
+    """Write bytes to a sibling temp file, then swap it into place.
+
+    Readers see either the old or the new contents, never a torn write.
+    """
+    # A unique temp name per call, so concurrent writers of one path never
+    # share (and rename) each other's half-written file. Plain open() rather
+    # than mkstemp so the file gets the usual umask mode instead of 0600.
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "xb") as f:
+            f.write(data)
+        # Saving over an existing file keeps its permissions
+        if path.exists():
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def write_text_atomic(path: Path, text: str):
+    """Atomically write text as UTF-8, whatever the platform locale is."""
+    write_bytes_atomic(path, text.encode("utf-8"))
+
+
+def read_text_compat(path: Path) -> str:
+    """Read a project file as UTF-8, falling back to the locale encoding.
+
+    Older builds (and hand edits on Windows) wrote files in the locale encoding.
+    """
+    data = path.read_bytes()
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode(locale.getpreferredencoding(False))
+
+
+def read_storyboard(path: Path):
+    data = path.read_bytes()
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # orjson only takes strict UTF-8; retry the way older builds read it
+        return json.loads(data.decode(locale.getpreferredencoding(False)))
+
+
+# Manim writes to media/videos/<script stem>/<resolution+fps>/<Scene>.mp4
+QUALITY_DIRS = {
+    "l": "480p15",
+    "m": "720p30",
+    "h": "1080p60",
+    "p": "1440p60",
+    "k": "2160p60",
+}
+
+
+def find_rendered_mp4(scene_path: Path, quality: str) -> Path | None:
+    """Locate the MP4 Manim produced for ``GeneratedScene`` in scene_path."""
+    videos_dir = PROJECT_DIR / "media" / "videos" / scene_path.stem
+    quality_dir = QUALITY_DIRS.get(quality)
+    if quality_dir:
+        expected = videos_dir / quality_dir / "GeneratedScene.mp4"
+        if expected.exists():
+            return expected
+
+    # Unknown quality flag or renamed output: check each resolution dir
+    if not videos_dir.is_dir():
+        return None
+    candidates = []
+    for entry in os.scandir(videos_dir):
+        if not entry.is_dir():
+            continue
+        mp4 = Path(entry.path) / "GeneratedScene.mp4"
+        if mp4.exists():
+            candidates.append(mp4)
+    return max(candidates, key=os.path.getmtime, default=None)
+
+
+# One client per API key so its connection pool (and TLS sessions) are
+# reused across requests instead of being rebuilt on every call.
+_client_cache: dict[str, anthropic.Anthropic] = {}
+_client_lock = threading.Lock()
+
+# Same caps as the SDK default, but idle sockets stay open for 60s (httpx
+# drops them after 5s) so follow-up chat turns skip the TCP/TLS handshake.
+ANTHROPIC_POOL_LIMITS = httpx.Limits(
+    max_connections=1000,
+    max_keepalive_connections=100,
+    keepalive_expiry=60,
+)
+# Keep the SDK's 600s read timeout: non-streaming calls receive nothing until
+# the whole reply is generated, and a timed-out call is retried (and billed).
+# Only the connect timeout is raised, to ride out slow handshakes.
+ANTHROPIC_TIMEOUT = anthropic.Timeout(anthropic.DEFAULT_TIMEOUT.read, connect=10.0)
+
+
+def _get_client(api_key: str) -> anthropic.Anthropic:
+    with _client_lock:
+        client = _client_cache.get(api_key)
+        if client is None:
+            client = anthropic.Anthropic(
+                api_key=api_key,
+                timeout=ANTHROPIC_TIMEOUT,
+                http_client=anthropic.DefaultHttpxClient(limits=ANTHROPIC_POOL_LIMITS),
+            )
+            _client_cache[api_key] = client
+        return client
+
+
+# Bound concurrent /api/render Manim processes; extra requests wait their turn
+RENDER_SEMAPHORE = asyncio.Semaphore(os.cpu_count() or 1)
+
+
 # ---------------------------------------------------------------------------
 # Request models
 # ---------------------------------------------------------------------------
@@ -152,15 +302,13 @@ RENDERS_INDEX_PATH = PROJECT_DIR / "renders.json"
 
 def load_renders_index() -> list[dict]:
     if RENDERS_INDEX_PATH.exists():
-        with open(RENDERS_INDEX_PATH, "r") as f:
-            return json.load(f)
+        return json.loads(RENDERS_INDEX_PATH.read_text())
     return []
 
 
 def save_renders_index(renders: list[dict]):
     RENDERS_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(RENDERS_INDEX_PATH, "w") as f:
-        json.dump(renders, f, indent=2)
+    write_text_atomic(RENDERS_INDEX_PATH, json.dumps(renders, indent=2))
 
 
 def auto_save_render(mp4_path: str, quality: str) -> dict:
@@ -204,37 +352,82 @@ RULES:
 1. Output EXACTLY ONE Python code block containing a complete, self-contained Manim scene.
 2. The scene class MUST be named `GeneratedScene` and MUST inherit from `Scene` (or `ThreeDScene` for 3D content).
 3. Use `from manim import *` as the only external import.
-{latex_rules}
-6. Create smooth, well-paced animations with `self.play()` and `self.wait()`.
-7. Use clean geometric primitives (Circle, Square, Arrow, Line, etc.) — never try to replicate hand-drawn imperfections.
-8. Use appropriate colors and spatial layout inspired by the sketch, but make everything polished and professional.
-9. Keep the animation between 3-10 seconds total.
-10. Do NOT use any external files, images, assets, SVGMobject, or SVG-related classes.
-11. Ensure all objects fit within the default Manim frame (roughly -7 to 7 horizontal, -4 to 4 vertical).
-{component_rules}
+4. Create smooth, well-paced animations with `self.play()` and `self.wait()`.
+5. Use clean geometric primitives (Circle, Square, Arrow, Line, etc.) — never try to replicate hand-drawn imperfections.
+6. Use appropriate colors and spatial layout inspired by the sketch, but make everything polished and professional.
+7. Keep the animation between 3-10 seconds total.
+8. Do NOT use any external files, images, assets, SVGMobject, or SVG-related classes.
+9. Ensure all objects fit within the default Manim frame (roughly -7 to 7 horizontal, -4 to 4 vertical).
+"""
+
+CATALOG_SUMMARY_TEMPLATE = """
+AVAILABLE COMPONENTS (the user may select any of these; selected components are included in full below):
+{summary}
+
+If you need a component that is not included below, recreate a simplified version based on the name and base classes shown above.
+"""
+
+RESPONSE_INSTRUCTION = """
 RESPOND WITH ONLY THE CODE BLOCK. No analysis, no explanations — just the code."""
 
+# Marks the end of a cacheable prompt prefix (Anthropic prompt caching).
+EPHEMERAL_CACHE = {"type": "ephemeral"}
+
+
+LATEX_ENABLED_RULES = """
+TEXT AND MATH:
+- You can use `MathTex()` and `Tex()` for mathematical notation. LaTeX IS available.
+  - For Dirac notation: `MathTex(r'|\\psi\\rangle')`, `MathTex(r'\\langle\\phi|')`
+  - For matrices: `MathTex(r'\\begin{pmatrix} a \\\\ b \\end{pmatrix}')`
+  - For operators: `MathTex(r'\\hat{H}')`, `MathTex(r'\\sigma_x')`
+  - For plain text labels, still prefer `Text()`.
+- For mathematical expressions, prefer `MathTex()` for proper typesetting.
+"""
+
+LATEX_DISABLED_RULES = """
+TEXT AND MATH:
+- Use `Text()` (Pango) instead of `MathTex()` or `Tex()` for all text — LaTeX is NOT available.
+- For mathematical expressions, use Unicode characters within `Text()` (e.g., Text("x² + y² = r²")).
+"""
 
-LATEX_ENABLED_RULES = """4. You can use `MathTex()` and `Tex()` for mathematical notation. LaTeX IS available.
-   - For Dirac notation: `MathTex(r'|\\psi\\rangle')`, `MathTex(r'\\langle\\phi|')`
-   - For matrices: `MathTex(r'\\begin{pmatrix} a \\\\ b \\end{pmatrix}')`
-   - For operators: `MathTex(r'\\hat{H}')`, `MathTex(r'\\sigma_x')`
-   - For plain text labels, still prefer `Text()`.
-5. For mathematical expressions, prefer `MathTex()` for proper typesetting."""
 
-LATEX_DISABLED_RULES = """4. Use `Text()` (Pango) instead of `MathTex()` or `Tex()` for all text — LaTeX is NOT available.
-5. For mathematical expressions, use Unicode characters within `Text()` (e.g., Text("x² + y² = r²"))."""
+@functools.lru_cache(maxsize=1)
+def get_static_system_prompt() -> str:
+    """Return the part of the system prompt shared by every request.
+
+    It is identical for every user and request, so it forms the shared
+    cached prefix. Built once, on first use, since it needs the catalog.
+    """
+    summary = get_catalog().get_summary()
+    if not summary.strip():
+        return BASE_SYSTEM_PROMPT
+    return BASE_SYSTEM_PROMPT + CATALOG_SUMMARY_TEMPLATE.format(summary=summary)
 
 
 def build_system_prompt(
     latex_available: bool,
     selected_components: list[str] | None = None,
-) -> str:
+) -> list[dict]:
+    """Build the system prompt as content blocks for ``messages.create``.
+
+    The first block never changes between requests; only the second (LaTeX
+    rules and selected component source) depends on the request. Both end in
+    a cache breakpoint so the shared prefix is reused across all users.
+    """
+    components_key = tuple(sorted(set(selected_components or ())))
+    return list(_build_system_prompt_cached(latex_available, components_key))
+
+
+@functools.lru_cache(maxsize=128)
+def _build_system_prompt_cached(
+    latex_available: bool,
+    selected_components: tuple[str, ...],
+) -> tuple[dict, ...]:
     latex_rules = LATEX_ENABLED_RULES if latex_available else LATEX_DISABLED_RULES
 
     component_rules = ""
     if selected_components:
-        component_source = catalog.get_component_source(selected_components)
+        component_source = get_catalog().get_component_source(list(selected_components))
         if component_source:
             component_rules = f"""
 AVAILABLE COMPONENT LIBRARY:
@@ -248,20 +441,17 @@ BEFORE the GeneratedScene class in your output. Use them as building blocks inst
 When using these components, include the full class definition(s) in your output so the code is self-contained.
 """
 
-    # Always include the catalog summary so the AI knows what's available
-    summary = catalog.get_summary()
-    if summary.strip():
-        if not component_rules:
-            component_rules = f"""
-AVAILABLE COMPONENTS (not included in this prompt, but the user may select them):
-{summary}
-
-If you need any of these components, recreate simplified versions based on the names and base classes shown above.
-"""
-
-    return BASE_SYSTEM_PROMPT.format(
-        latex_rules=latex_rules,
-        component_rules=component_rules,
+    return (
+        {
+            "type": "text",
+            "text": get_static_system_prompt(),
+            "cache_control": EPHEMERAL_CACHE,
+        },
+        {
+            "type": "text",
+            "text": latex_rules + component_rules + RESPONSE_INSTRUCTION,
+            "cache_control": EPHEMERAL_CACHE,
+        },
     )
 
 
@@ -271,9 +461,11 @@ If you need any of these components, recreate simplified versions based on the n
 
 @app.get("/api/status")
 def get_status():
+    # Don't wait on the catalog warm-up; report no count until it is ready
+    catalog = peek_catalog()
     return {
         "latex_available": LATEX_AVAILABLE,
-        "template_count": len(catalog.get_components()),
+        "template_count": catalog.component_count() if catalog else None,
     }
 
 
@@ -287,14 +479,14 @@ def refresh_status():
 @app.get("/api/templates")
 def get_templates():
     return {
-        "categories": catalog.get_categories(),
-        "examples": catalog.get_examples_list(),
+        "categories": get_catalog().get_categories(),
+        "examples": get_catalog().get_examples_list(),
     }
 
 
 @app.get("/api/templates/{name}/source")
 def get_template_source(name: str):
-    item = catalog.get_by_name(name)
+    item = get_catalog().get_by_name(name)
     if not item:
         return JSONResponse({"error": f"Template '{name}' not found"}, status_code=404)
     return {
@@ -306,24 +498,21 @@ def get_template_source(name: str):
 
 
 @app.get("/api/load")
-def load_project():
+async def load_project():
     ensure_project_dir()
 
     storyboard_json = None
     storyboard_path = PROJECT_DIR / "storyboard.tldr.json"
     if storyboard_path.exists():
-        with open(storyboard_path, "r") as f:
-            storyboard_json = json.load(f)
+        storyboard_json = await asyncio.to_thread(read_storyboard, storyboard_path)
 
     scene_code = None
     scene_path = PROJECT_DIR / "scene.py"
     if scene_path.exists():
-        with open(scene_path, "r") as f:
-            scene_code = f.read()
+        scene_code = await asyncio.to_thread(read_text_compat, scene_path)
     else:
         scene_code = DEFAULT_SCENE
-        with open(scene_path, "w") as f:
-            f.write(DEFAULT_SCENE)
+        await asyncio.to_thread(write_text_atomic, scene_path, DEFAULT_SCENE)
 
     has_render = (PROJECT_DIR / "render.mp4").exists()
 
@@ -335,27 +524,48 @@ def load_project():
 
 
 @app.post("/api/save")
-def save_project(req: SaveRequest):
+async def save_project(req: SaveRequest):
     ensure_project_dir()
 
     if req.storyboard_json is not None:
-        with open(PROJECT_DIR / "storyboard.tldr.json", "w") as f:
-            json.dump(req.storyboard_json, f, indent=2)
+        await asyncio.to_thread(
+            write_bytes_atomic,
+            PROJECT_DIR / "storyboard.tldr.json",
+            orjson.dumps(req.storyboard_json, option=orjson.OPT_INDENT_2),
+        )
 
     if req.scene_code is not None:
-        with open(PROJECT_DIR / "scene.py", "w") as f:
-            f.write(req.scene_code)
+        await asyncio.to_thread(write_text_atomic, PROJECT_DIR / "scene.py", req.scene_code)
 
     return {"ok": True}
 
 
+def _finish_render(scene_path: Path, quality: str, returncode: int, log: str) -> dict:
+    """Record the log and publish the MP4 after a render; blocking file I/O."""
+    (PROJECT_DIR / "render.log").write_text(log)
+
+    latest = find_rendered_mp4(scene_path, quality)
+
+    if latest and returncode == 0:
+        shutil.copy2(latest, str(PROJECT_DIR / "render.mp4"))
+        entry = auto_save_render(str(latest), quality)
+        return {
+            "ok": True,
+            "mp4_url": "/api/render.mp4",
+            "log": log,
+            "render_id": entry["id"],
+            "render_name": entry["name"],
+        }
+    else:
+        return {"ok": False, "mp4_url": None, "log": log}
+
+
 @app.post("/api/render")
-def render_scene(req: RenderRequest):
+async def render_scene(req: RenderRequest):
     ensure_project_dir()
 
     scene_path = PROJECT_DIR / "scene.py"
-    with open(scene_path, "w") as f:
-        f.write(req.scene_code)
+    await asyncio.to_thread(write_text_atomic, scene_path, req.scene_code)
 
     # Build env with Homebrew + LaTeX paths so ffmpeg/cairo/pdflatex are findable
     env = os.environ.copy()
@@ -366,57 +576,46 @@ def render_scene(req: RenderRequest):
     env["PATH"] = ":".join(extra_paths) + ":" + existing
 
     try:
-        result = subprocess.run(
-            [
+        async with RENDER_SEMAPHORE:
+            proc = await asyncio.create_subprocess_exec(
                 sys.executable,
-                "-m",
-                "manim",
-                "render",
+                "-m", "manim", "render",
                 f"-q{req.quality}",
-                "--media_dir",
-                str(PROJECT_DIR / "media"),
+                "--media_dir", str(PROJECT_DIR / "media"),
                 str(scene_path),
                 "GeneratedScene",
-            ],
-            capture_output=True,
-            text=True,
-            timeout=120,
-            cwd=str(PROJECT_DIR),
-            env=env,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=str(PROJECT_DIR),
+                env=env,
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=120)
+            finally:
+                # Timed out, or the request was cancelled (client went away):
+                # don't leave Manim running once its semaphore slot is freed
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+
+        log = (
+            stdout.decode("utf-8", errors="replace")
+            + "\n"
+            + stderr.decode("utf-8", errors="replace")
         )
-
-        log = result.stdout + "\n" + result.stderr
-        with open(PROJECT_DIR / "render.log", "w") as f:
-            f.write(log)
-
-        mp4_files = glob.glob(
-            str(PROJECT_DIR / "media" / "**" / "*.mp4"), recursive=True
+        # Copying the MP4 (twice) must not stall other requests on the loop
+        return await asyncio.to_thread(
+            _finish_render, scene_path, req.quality, proc.returncode, log
         )
 
-        if mp4_files and result.returncode == 0:
-            latest = max(mp4_files, key=os.path.getmtime)
-            shutil.copy2(latest, str(PROJECT_DIR / "render.mp4"))
-            entry = auto_save_render(latest, req.quality)
-            return {
-                "ok": True,
-                "mp4_url": "/api/render.mp4",
-                "log": log,
-                "render_id": entry["id"],
-                "render_name": entry["name"],
-            }
-        else:
-            return {"ok": False, "mp4_url": None, "log": log}
-
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         log = "Render timed out after 120 seconds."
-        with open(PROJECT_DIR / "render.log", "w") as f:
-            f.write(log)
+        await asyncio.to_thread((PROJECT_DIR / "render.log").write_text, log)
         return {"ok": False, "mp4_url": None, "log": log}
 
     except Exception as e:
         log = f"Render error: {str(e)}"
-        with open(PROJECT_DIR / "render.log", "w") as f:
-            f.write(log)
+        await asyncio.to_thread((PROJECT_DIR / "render.log").write_text, log)
         return {"ok": False, "mp4_url": None, "log": log}
 
 
@@ -425,8 +624,7 @@ async def render_scene_stream(req: RenderRequest):
     ensure_project_dir()
 
     scene_path = PROJECT_DIR / "scene.py"
-    with open(scene_path, "w") as f:
-        f.write(req.scene_code)
+    await asyncio.to_thread(write_text_atomic, scene_path, req.scene_code)
 
     # Build env with Homebrew + LaTeX paths
     env = os.environ.copy()
@@ -438,130 +636,119 @@ async def render_scene_stream(req: RenderRequest):
 
     async def event_stream():
         try:
-            proc = await asyncio.create_subprocess_exec(
-                sys.executable,
-                "-m", "manim", "render",
-                f"-q{req.quality}",
-                "--media_dir", str(PROJECT_DIR / "media"),
-                str(scene_path),
-                "GeneratedScene",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=str(PROJECT_DIR),
-                env=env,
-            )
-
-            async def read_stream(stream):
-                while True:
-                    line = await stream.readline()
-                    if not line:
-                        break
-                    yield line.decode("utf-8", errors="replace").rstrip("\n")
-
             log_lines = []
 
-            # Read both stdout and stderr concurrently
-            async def drain(stream):
-                async for line in read_stream(stream):
-                    log_lines.append(line)
-                    yield f"data: {json.dumps({'type': 'log', 'line': line})}\n\n"
-
-            # We need to interleave stdout and stderr. Use asyncio.Queue
-            queue: asyncio.Queue[str | None] = asyncio.Queue()
-
-            async def enqueue_stream(stream):
-                async for line_bytes in stream:
-                    line = line_bytes.decode("utf-8", errors="replace").rstrip("\n")
-                    log_lines.append(line)
-                    await queue.put(line)
-                await queue.put(None)
-
-            # Start reading both streams
-            tasks = []
-            if proc.stdout:
-                tasks.append(asyncio.create_task(enqueue_stream(proc.stdout)))
-            if proc.stderr:
-                tasks.append(asyncio.create_task(enqueue_stream(proc.stderr)))
-
-            done_count = 0
-            total_streams = len(tasks)
-            while done_count < total_streams:
-                line = await queue.get()
-                if line is None:
-                    done_count += 1
-                    continue
-                yield f"data: {json.dumps({'type': 'log', 'line': line})}\n\n"
-
-            await proc.wait()
-            for t in tasks:
-                await t
+            # Shares the /api/render limit on concurrent Manim processes
+            async with RENDER_SEMAPHORE:
+                proc = await asyncio.create_subprocess_exec(
+                    sys.executable,
+                    "-m", "manim", "render",
+                    f"-q{req.quality}",
+                    "--media_dir", str(PROJECT_DIR / "media"),
+                    str(scene_path),
+                    "GeneratedScene",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=str(PROJECT_DIR),
+                    env=env,
+                )
+
+                # We need to interleave stdout and stderr. Use asyncio.Queue
+                queue: asyncio.Queue[str | None] = asyncio.Queue()
+
+                async def enqueue_stream(stream):
+                    async for line_bytes in stream:
+                        line = line_bytes.decode("utf-8", errors="replace").rstrip("\n")
+                        log_lines.append(line)
+                        await queue.put(line)
+                    await queue.put(None)
+
+                # Start reading both streams
+                tasks = []
+                if proc.stdout:
+                    tasks.append(asyncio.create_task(enqueue_stream(proc.stdout)))
+                if proc.stderr:
+                    tasks.append(asyncio.create_task(enqueue_stream(proc.stderr)))
+
+                try:
+                    done_count = 0
+                    total_streams = len(tasks)
+                    while done_count < total_streams:
+                        line = await queue.get()
+                        if line is None:
+                            done_count += 1
+                            continue
+                        yield f"data: {json.dumps({'type': 'log', 'line': line})}\n\n"
+
+                    await proc.wait()
+                    for t in tasks:
+                        await t
+                finally:
+                    # The client disconnected mid-render: stop Manim and the readers
+                    if proc.returncode is None:
+                        proc.kill()
+                        await proc.wait()
+                    for t in tasks:
+                        t.cancel()
 
             full_log = "\n".join(log_lines)
-            with open(PROJECT_DIR / "render.log", "w") as f:
-                f.write(full_log)
-
-            mp4_files = glob.glob(
-                str(PROJECT_DIR / "media" / "**" / "*.mp4"), recursive=True
+            # Copying the MP4 (twice) must not stall other requests on the loop
+            result = await asyncio.to_thread(
+                _finish_render, scene_path, req.quality, proc.returncode, full_log
             )
-
-            if mp4_files and proc.returncode == 0:
-                latest = max(mp4_files, key=os.path.getmtime)
-                shutil.copy2(latest, str(PROJECT_DIR / "render.mp4"))
-                entry = auto_save_render(latest, req.quality)
-                yield f"data: {json.dumps({'type': 'result', 'ok': True, 'mp4_url': '/api/render.mp4', 'log': full_log, 'render_id': entry['id'], 'render_name': entry['name']})}\n\n"
-            else:
-                yield f"data: {json.dumps({'type': 'result', 'ok': False, 'mp4_url': None, 'log': full_log})}\n\n"
+            yield _sse({"type": "result", **result})
 
         except Exception as e:
             log = f"Render error: {str(e)}"
-            with open(PROJECT_DIR / "render.log", "w") as f:
-                f.write(log)
+            await asyncio.to_thread((PROJECT_DIR / "render.log").write_text, log)
             yield f"data: {json.dumps({'type': 'result', 'ok': False, 'mp4_url': None, 'log': log})}\n\n"
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
+# The captured body is stripped afterwards, so the patterns carry no \s* around
+# the lazy group; that pairing backtracks quadratically on long whitespace runs
+_PY_FENCE = re.compile(r"```python(.*?)```", re.DOTALL)
+_ANY_FENCE = re.compile(r"```(.*?)```", re.DOTALL)
+
+
 def extract_code_from_response(response_text: str) -> str:
     """Extract Python code from Claude's markdown-fenced response."""
-    match = re.search(r"```python\s*(.*?)\s*```", response_text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    if "```" in response_text:
-        match = re.search(r"```\s*(.*?)\s*```", response_text, re.DOTALL)
-        return match.group(1).strip() if match else response_text.strip()
-    return response_text.strip()
+    if "```" not in response_text:
+        return response_text.strip()
+    match = _PY_FENCE.search(response_text) or _ANY_FENCE.search(response_text)
+    return match.group(1).strip() if match else response_text.strip()
 
 
-class ChatRequest(BaseModel):
-    messages: list[dict]
-    model: str = "claude-sonnet-4-5-20250929"
-    selected_components: list[str] | None = None
+# Charset/padding check (plus a length check below): validates multi-MB
+# payloads without decoding them
+_BASE64_RE = re.compile(r"[A-Za-z0-9+/]*={0,2}")
 
 
-@app.post("/api/generate")
-def generate_from_sketch(req: GenerateRequest):
-    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
-    if not api_key:
-        return {
-            "ok": False,
-            "code": None,
-            "error": "ANTHROPIC_API_KEY not configured. Add it to backend/.env",
-        }
+def sketch_frames(req: GenerateRequest) -> list[FrameImage]:
+    # Prefer new multi-image field, fall back to legacy single-image
+    if not req.images and req.image_base64:
+        return [FrameImage(name="Sketch", base64=req.image_base64)]
+    return req.images
 
-    system_prompt = build_system_prompt(
-        latex_available=LATEX_AVAILABLE,
-        selected_components=req.selected_components,
-    )
 
-    user_text = req.prompt.strip() if req.prompt else "Generate Manim code that recreates this sketch as an animation."
+def validate_sketch_frames(req: GenerateRequest) -> str | None:
+    """Return an error message if the request has no usable frames."""
+    frames = sketch_frames(req)
+    if not frames:
+        return "No images provided."
+    for frame in frames:
+        data = frame.base64
+        if not data or len(data) % 4 or not _BASE64_RE.fullmatch(data):
+            return f"Frame '{frame.name}' is not valid base64 image data."
+    return None
 
-    # Build images list: prefer new multi-image field, fall back to legacy single-image
-    frames = req.images
-    if not frames and req.image_base64:
-        frames = [FrameImage(name="Sketch", base64=req.image_base64)]
 
-    if not frames:
-        return {"ok": False, "code": None, "error": "No images provided."}
+def build_sketch_content(req: GenerateRequest) -> list[dict]:
+    """Build the user message content for a sketch's frames and prompt."""
+    user_text = req.prompt.strip() if req.prompt else "Generate Manim code that recreates this sketch as an animation."
+
+    frames = sketch_frames(req)
 
     # Build content blocks: label each frame, then add the user's text prompt
     content_blocks: list[dict] = []
@@ -580,9 +767,84 @@ def generate_from_sketch(req: GenerateRequest):
             },
         })
     content_blocks.append({"type": "text", "text": user_text})
+    return content_blocks
+
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
 
+
+def stream_code_events(
+    api_key: str,
+    model: str,
+    system_prompt: list[dict],
+    messages: list[dict],
+    error_label: str,
+):
+    """Stream Claude's reply as SSE deltas, then a final result with the code."""
     try:
-        client = anthropic.Anthropic(api_key=api_key)
+        client = _get_client(api_key)
+        response_parts = []
+        with client.messages.stream(
+            model=model,
+            max_tokens=8192,
+            system=system_prompt,
+            messages=messages,
+        ) as stream:
+            for text in stream.text_stream:
+                response_parts.append(text)
+                yield _sse({"type": "delta", "text": text})
+
+        code = extract_code_from_response("".join(response_parts))
+        yield _sse({"type": "result", "ok": True, "code": code, "error": None})
+
+    except anthropic.AuthenticationError:
+        error = "Authentication failed: check your ANTHROPIC_API_KEY."
+        yield _sse({"type": "result", "ok": False, "code": None, "error": error})
+    except anthropic.RateLimitError:
+        error = "Rate limit exceeded. Try again in a moment."
+        yield _sse({"type": "result", "ok": False, "code": None, "error": error})
+    except anthropic.APIError as e:
+        error = f"Claude API error: {e}"
+        yield _sse({"type": "result", "ok": False, "code": None, "error": error})
+    except Exception as e:
+        error = f"{error_label} error: {e}"
+        yield _sse({"type": "result", "ok": False, "code": None, "error": error})
+
+
+def _stream_error(error: str) -> StreamingResponse:
+    event = _sse({"type": "result", "ok": False, "code": None, "error": error})
+    return StreamingResponse(iter([event]), media_type="text/event-stream")
+
+
+class ChatRequest(BaseModel):
+    messages: list[dict]
+    model: str = "claude-sonnet-4-5-20250929"
+    selected_components: list[str] | None = None
+
+
+@app.post("/api/generate")
+def generate_from_sketch(req: GenerateRequest):
+    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    if not api_key:
+        return {
+            "ok": False,
+            "code": None,
+            "error": "ANTHROPIC_API_KEY not configured. Add it to backend/.env",
+        }
+
+    error = validate_sketch_frames(req)
+    if error:
+        return {"ok": False, "code": None, "error": error}
+
+    system_prompt = build_system_prompt(
+        latex_available=LATEX_AVAILABLE,
+        selected_components=req.selected_components,
+    )
+    content_blocks = build_sketch_content(req)
+
+    try:
+        client = _get_client(api_key)
         message = client.messages.create(
             model=req.model,
             max_tokens=8192,
@@ -628,7 +890,7 @@ def chat_refine(req: ChatRequest):
     )
 
     try:
-        client = anthropic.Anthropic(api_key=api_key)
+        client = _get_client(api_key)
         message = client.messages.create(
             model=req.model,
             max_tokens=8192,
@@ -658,6 +920,47 @@ def chat_refine(req: ChatRequest):
         return {"ok": False, "code": None, "error": f"Chat error: {e}"}
 
 
+@app.post("/api/generate/stream")
+def generate_from_sketch_stream(req: GenerateRequest):
+    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    if not api_key:
+        return _stream_error("ANTHROPIC_API_KEY not configured. Add it to backend/.env")
+
+    error = validate_sketch_frames(req)
+    if error:
+        return _stream_error(error)
+    content_blocks = build_sketch_content(req)
+
+    system_prompt = build_system_prompt(
+        latex_available=LATEX_AVAILABLE,
+        selected_components=req.selected_components,
+    )
+    events = stream_code_events(
+        api_key,
+        req.model,
+        system_prompt,
+        [{"role": "user", "content": content_blocks}],
+        "Generation",
+    )
+    return StreamingResponse(events, media_type="text/event-stream")
+
+
+@app.post("/api/chat/stream")
+def chat_refine_stream(req: ChatRequest):
+    api_key = os.environ.get("ANTHROPIC_API_KEY", "")
+    if not api_key:
+        return _stream_error("ANTHROPIC_API_KEY not configured. Add it to backend/.env")
+
+    system_prompt = build_system_prompt(
+        latex_available=LATEX_AVAILABLE,
+        selected_components=req.selected_components,
+    )
+    events = stream_code_events(
+        api_key, req.model, system_prompt, req.messages, "Chat"
+    )
+    return StreamingResponse(events, media_type="text/event-stream")
+
+
 # ---------------------------------------------------------------------------
 # Render library endpoints
 # ---------------------------------------------------------------------------
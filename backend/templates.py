@@ -7,10 +7,16 @@ Scene classes, then serves them via a structured catalog.
 """
 
 import ast
-import json
+import functools
+import re
 import textwrap
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterator
+
+import orjson
 
 SAMPLES_DIR = Path(__file__).resolve().parent.parent / "manim_code_samples"
 
@@ -79,12 +85,12 @@ class TemplateClass:
     notebook: str  # which notebook it came from
 
 
-def _extract_code_cells(notebook_path: Path) -> list[str]:
-    """Read a .ipynb file and return the source of all code cells."""
-    with open(notebook_path, "r", encoding="utf-8") as f:
-        nb = json.load(f)
+def _extract_code_cells(notebook_path: Path) -> Iterator[str]:
+    """Read a .ipynb file and yield the source of each non-empty code cell."""
+    # The notebooks are several MB of mostly base64 outputs; orjson parses
+    # them about twice as fast as the stdlib json module
+    nb = orjson.loads(notebook_path.read_bytes())
 
-    cells = []
     for cell in nb.get("cells", []):
         if cell.get("cell_type") != "code":
             continue
@@ -94,18 +100,65 @@ def _extract_code_cells(notebook_path: Path) -> list[str]:
         else:
             text = source
         if text.strip():
-            cells.append(text)
-    return cells
+            yield text
 
 
-def _extract_classes_from_source(source: str, notebook_name: str) -> list[TemplateClass]:
-    """Use ast to extract top-level class definitions from Python source."""
-    classes = []
+def _read_code_cells(notebook_path: Path) -> list[str]:
+    return list(_extract_code_cells(notebook_path))
+
 
+# A top-level class statement always starts at column 0. This regex is the
+# cheap triage step; a tokenize-based class scanner was measured ~2x slower
+# than ast.parse itself (tokenize is pure Python), so ast stays the parser.
+_TOP_LEVEL_CLASS = re.compile(r"^class\s", re.MULTILINE)
+
+
+def _parse_source(source: str) -> ast.Module | None:
+    """Parse Python source, returning None if it is not valid syntax."""
     try:
-        tree = ast.parse(source)
+        return ast.parse(source)
     except SyntaxError:
-        return classes
+        return None
+
+
+def _parse_cells(cells: list[str]) -> list[tuple[str, ast.Module | None]]:
+    """Parse each cell once so the tree can be shared by later passes.
+
+    Cells without a top-level class statement cannot contribute templates,
+    so they are not parsed and get a tree of None, like invalid cells.
+    """
+    parsed = []
+    for cell_source in cells:
+        tree = None
+        if _TOP_LEVEL_CLASS.search(cell_source):
+            tree = _parse_source(cell_source)
+        parsed.append((cell_source, tree))
+    return parsed
+
+
+def _uses_latex(node: ast.ClassDef) -> bool:
+    """Whether a class references a LaTeX mobject (Tex, MathTex, ...).
+
+    Checks names in code rather than raw text, so a mention in a comment or
+    docstring does not mark the class as needing LaTeX.
+    """
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name):
+            name = child.id
+        elif isinstance(child, ast.Attribute):
+            name = child.attr
+        else:
+            continue
+        if name.endswith("Tex"):
+            return True
+    return False
+
+
+def _extract_classes_from_tree(
+    tree: ast.Module, source: str, notebook_name: str
+) -> list[TemplateClass]:
+    """Extract top-level class definitions from an already-parsed cell."""
+    classes = []
 
     lines = source.splitlines(keepends=True)
 
@@ -138,7 +191,8 @@ def _extract_classes_from_source(source: str, notebook_name: str) -> list[Templa
         class_source = "".join(lines[start:end]).rstrip()
 
         is_scene = bool(set(base_names) & SCENE_BASES)
-        requires_latex = "MathTex" in class_source or "Tex(" in class_source
+        # The substring test is a cheap filter; most classes skip the walk
+        requires_latex = "Tex" in class_source and _uses_latex(node)
 
         category = CATEGORY_MAP.get(node.name, "examples" if is_scene else "other")
 
@@ -155,36 +209,63 @@ def _extract_classes_from_source(source: str, notebook_name: str) -> list[Templa
     return classes
 
 
-def _find_component_cell(cells: list[str]) -> str | None:
+def _extract_classes_from_source(source: str, notebook_name: str) -> list[TemplateClass]:
+    """Use ast to extract top-level class definitions from Python source."""
+    if not _TOP_LEVEL_CLASS.search(source):
+        return []
+    tree = _parse_source(source)
+    if tree is None:
+        return []
+    return _extract_classes_from_tree(tree, source, notebook_name)
+
+
+def _extract_cell_classes(
+    parsed_cells: list[tuple[str, ast.Module | None]], notebook_name: str
+) -> list[tuple[str, list[TemplateClass]]]:
+    """Extract the classes of every parsed cell, skipping unparsed ones."""
+    return [
+        (cell_source, _extract_classes_from_tree(tree, cell_source, notebook_name))
+        for cell_source, tree in parsed_cells
+        if tree is not None
+    ]
+
+
+def _find_component_cell(cell_classes: list[tuple[str, list[TemplateClass]]]) -> str | None:
     """Find the large cell containing component class definitions.
 
     This is the cell with the most class definitions that are NOT Scene subclasses.
     """
-    best_cell = None
-    best_count = 0
-
-    for cell_source in cells:
-        try:
-            tree = ast.parse(cell_source)
-        except SyntaxError:
-            continue
-
-        component_count = 0
-        for node in ast.iter_child_nodes(tree):
-            if not isinstance(node, ast.ClassDef):
-                continue
-            base_names = []
-            for base in node.bases:
-                if isinstance(base, ast.Name):
-                    base_names.append(base.id)
-            if not (set(base_names) & SCENE_BASES):
-                component_count += 1
-
-        if component_count > best_count:
-            best_count = component_count
-            best_cell = cell_source
+    scored = [
+        (sum(not cls.is_scene for cls in classes), cell_source)
+        for cell_source, classes in cell_classes
+    ]
+    # max() keeps the first of equally scored cells
+    best_count, best_cell = max(scored, key=lambda item: item[0], default=(0, None))
+    return best_cell if best_count else None
+
+
+def _load_notebook(
+    notebook_path: Path,
+) -> tuple[list[TemplateClass], list[TemplateClass]]:
+    """Extract (components, examples) from one notebook, before de-duplication.
+
+    Components come from the notebook's main component cell; examples are the
+    Scene classes in every other cell.
+    """
+    nb_name = notebook_path.stem
+    parsed_cells = _parse_cells(_read_code_cells(notebook_path))
+    cell_classes = _extract_cell_classes(parsed_cells, nb_name)
+    component_cell = _find_component_cell(cell_classes)
+
+    components = []
+    examples = []
+    for cell_source, classes in cell_classes:
+        if component_cell is not None and cell_source == component_cell:
+            components.extend(cls for cls in classes if not cls.is_scene)
+        else:
+            examples.extend(cls for cls in classes if cls.is_scene)
 
-    return best_cell
+    return components, examples
 
 
 class TemplateCatalog:
@@ -195,6 +276,13 @@ class TemplateCatalog:
         self._examples: list[TemplateClass] = []
         self._by_name: dict[str, TemplateClass] = {}
         self._load()
+        # The catalog never changes after loading, so build these once
+        self._categories_cached = self._build_categories()
+        self._summary_cached = self._build_summary()
+        # Per-instance so the cache does not keep the catalog alive
+        self._component_source_cached = functools.lru_cache(maxsize=64)(
+            self._build_component_source
+        )
 
     def _load(self):
         if not SAMPLES_DIR.exists():
@@ -207,31 +295,22 @@ class TemplateCatalog:
         seen_components: set[str] = set()
         seen_examples: set[str] = set()
 
-        # Process each notebook
-        for nb_path in notebooks:
-            nb_name = nb_path.stem
-            cells = _extract_code_cells(nb_path)
-
-            # Find and extract the main component cell
-            component_cell = _find_component_cell(cells)
-            if component_cell:
-                classes = _extract_classes_from_source(component_cell, nb_name)
-                for cls in classes:
-                    if not cls.is_scene and cls.name not in seen_components:
-                        seen_components.add(cls.name)
-                        self._components.append(cls)
-                        self._by_name[cls.name] = cls
-
-            # Extract Scene classes from all other cells
-            for cell_source in cells:
-                if cell_source == component_cell:
-                    continue
-                classes = _extract_classes_from_source(cell_source, nb_name)
-                for cls in classes:
-                    if cls.is_scene and cls.name not in seen_examples:
-                        seen_examples.add(cls.name)
-                        self._examples.append(cls)
-                        self._by_name[cls.name] = cls
+        # Parse notebooks concurrently; map() keeps results in sorted order so
+        # the first notebook to define a name still wins below
+        with ThreadPoolExecutor(max_workers=min(8, len(notebooks))) as pool:
+            results = list(pool.map(_load_notebook, notebooks))
+
+        for components, examples in results:
+            for cls in components:
+                if cls.name not in seen_components:
+                    seen_components.add(cls.name)
+                    self._components.append(cls)
+                    self._by_name[cls.name] = cls
+            for cls in examples:
+                if cls.name not in seen_examples:
+                    seen_examples.add(cls.name)
+                    self._examples.append(cls)
+                    self._by_name[cls.name] = cls
 
     def get_components(self) -> list[TemplateClass]:
         return list(self._components)
@@ -239,6 +318,12 @@ class TemplateCatalog:
     def get_examples(self) -> list[TemplateClass]:
         return list(self._examples)
 
+    def component_count(self) -> int:
+        return len(self._components)
+
+    def example_count(self) -> int:
+        return len(self._examples)
+
     def get_by_name(self, name: str) -> TemplateClass | None:
         return self._by_name.get(name)
 
@@ -247,6 +332,9 @@ class TemplateCatalog:
 
     def get_categories(self) -> list[dict]:
         """Return categories with their components for the frontend."""
+        return self._categories_cached
+
+    def _build_categories(self) -> list[dict]:
         cats: dict[str, list[dict]] = {}
         for comp in self._components:
             cat = comp.category
@@ -274,10 +362,14 @@ class TemplateCatalog:
 
         If names is None, return all components.
         """
-        if names is None:
+        names_key = None if names is None else tuple(sorted(set(names)))
+        return self._component_source_cached(names_key)
+
+    def _build_component_source(self, names_key: tuple[str, ...] | None) -> str:
+        if names_key is None:
             targets = self._components
         else:
-            name_set = set(names)
+            name_set = set(names_key)
             targets = [c for c in self._components if c.name in name_set]
 
         if not targets:
@@ -290,6 +382,9 @@ class TemplateCatalog:
 
     def get_summary(self) -> str:
         """Return a compact text summary of all components for inclusion in prompts."""
+        return self._summary_cached
+
+    def _build_summary(self) -> str:
         lines = []
         current_cat = ""
         for comp in self._components:
@@ -322,5 +417,20 @@ class TemplateCatalog:
         ]
 
 
-# Singleton catalog loaded at import time
-catalog = TemplateCatalog()
+# Singleton catalog, built on first use so importing this module stays cheap
+_catalog: TemplateCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def peek_catalog() -> TemplateCatalog | None:
+    """Return the catalog if it has finished loading, without triggering a load."""
+    return _catalog
+
+
+def get_catalog() -> TemplateCatalog:
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = TemplateCatalog()
+    return _catalog
@@ -0,0 +1,92 @@
+"""Shared pytest fixtures."""
+
+import os
+from pathlib import Path
+
+import orjson
+import pytest
+
+from templates import get_catalog
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    """Put pytest's temp dirs on tmpfs when available.
+
+    The API tests write project files and fake renders into tmp_path for
+    nearly every test; RAM-backed storage keeps that off the disk. Only the
+    temp root moves, so pytest keeps its numbered per-run directories and
+    concurrent runs never clear each other's. An explicit --basetemp or
+    PYTEST_DEBUG_TEMPROOT always wins.
+    """
+    shm = Path("/dev/shm")
+    if config.option.basetemp is None and shm.is_dir() and os.access(shm, os.W_OK):
+        os.environ.setdefault("PYTEST_DEBUG_TEMPROOT", str(shm))
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    """The real template catalog, built from the notebooks once per session."""
+    return get_catalog()
+
+
+@pytest.fixture(scope="session")
+def hadamard(catalog):
+    """The Hadamard component, or None if the notebooks do not define it."""
+    return catalog.get_by_name("Hadamard")
+
+
+SAMPLE_NOTEBOOK_CELLS = {
+    "mixed": [
+        {"cell_type": "markdown", "source": ["# Title"]},
+        {"cell_type": "code", "source": ["print('hello')"]},
+        {"cell_type": "code", "source": ["# empty stripped"], "outputs": []},
+        {"cell_type": "markdown", "source": ["Some text"]},
+        {"cell_type": "code", "source": ["x = 1"]},
+    ],
+    "string_source": [
+        {"cell_type": "code", "source": "single_string_source"},
+    ],
+    "empty_cells": [
+        {"cell_type": "code", "source": [""]},
+        {"cell_type": "code", "source": ["  \n  "]},
+        {"cell_type": "code", "source": ["real code"]},
+    ],
+}
+
+
+@pytest.fixture(scope="session")
+def sample_notebooks(tmp_path_factory):
+    """Small synthetic .ipynb files, written once per session, keyed by name."""
+    nb_dir = tmp_path_factory.mktemp("nbs")
+    paths = {}
+    for name, cells in SAMPLE_NOTEBOOK_CELLS.items():
+        nb = {"cells": cells, "metadata": {}, "nbformat": 4, "nbformat_minor": 4}
+        path = nb_dir / f"{name}.ipynb"
+        path.write_bytes(orjson.dumps(nb))
+        paths[name] = path
+    return paths
+
+
+@pytest.fixture(scope="session")
+def heavy_notebook(tmp_path_factory):
+    """A notebook whose one code cell carries ~1 MB of base64 image output.
+
+    Real notebooks are mostly render output around a little code. Kept apart
+    from ``sample_notebooks`` so only the test that needs it pays for it.
+    """
+    cell = {
+        "cell_type": "code",
+        "source": ["class Big(Scene):\n", "    pass\n"],
+        "outputs": [
+            {
+                "output_type": "display_data",
+                "data": {"image/png": "iVBORw0KGgo" * 100_000},
+                "metadata": {},
+            }
+        ],
+    }
+    nb = {"cells": [cell], "metadata": {}, "nbformat": 4, "nbformat_minor": 4}
+    path = tmp_path_factory.mktemp("heavy_nb") / "heavy_outputs.ipynb"
+    path.write_bytes(orjson.dumps(nb))
+    return path
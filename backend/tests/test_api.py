@@ -1,37 +1,53 @@
 """Tests for FastAPI endpoints in main.py."""
 
-import json
-import sys
-from pathlib import Path
-from unittest.mock import patch
+import asyncio
+import os
+from unittest.mock import MagicMock
 
+import httpx
+import orjson
 import pytest
-
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-
 from fastapi.testclient import TestClient
+
 import main
 from main import app
 
+# Pre-serialized renders.json for TestRenders._seed_render; only the id, name
+# and quality vary between tests.
+_RENDER_INDEX_TEMPLATE = (
+    b'[{"id":"%s","name":"%s",'
+    b'"created_at":"2025-01-01T00:00:00+00:00","quality":"%s"}]'
+)
 
-@pytest.fixture()
-def client(tmp_path):
-    """Create a test client with isolated project/render dirs."""
-    original_project_dir = main.PROJECT_DIR
-    original_renders_dir = main.RENDERS_DIR
-    original_renders_index = main.RENDERS_INDEX_PATH
+# Render video tests never inspect the file contents
+_DUMMY_MP4 = bytes(100)
 
-    main.PROJECT_DIR = tmp_path / "project"
-    main.RENDERS_DIR = main.PROJECT_DIR / "renders"
-    main.RENDERS_INDEX_PATH = main.PROJECT_DIR / "renders.json"
 
-    main.PROJECT_DIR.mkdir(parents=True, exist_ok=True)
+@pytest.fixture(scope="module")
+def _test_client():
+    """One TestClient shared by every test in this module."""
+    return TestClient(app)
 
-    yield TestClient(app)
 
-    main.PROJECT_DIR = original_project_dir
-    main.RENDERS_DIR = original_renders_dir
-    main.RENDERS_INDEX_PATH = original_renders_index
+@pytest.fixture()
+def client(_test_client, tmp_path, monkeypatch):
+    """Point the shared test client at isolated project/render dirs."""
+    project_dir = tmp_path / "project"
+    monkeypatch.setattr(main, "PROJECT_DIR", project_dir)
+    monkeypatch.setattr(main, "RENDERS_DIR", project_dir / "renders")
+    monkeypatch.setattr(main, "RENDERS_INDEX_PATH", project_dir / "renders.json")
+    project_dir.mkdir(parents=True, exist_ok=True)
+    return _test_client
+
+
+@pytest.fixture()
+def acall(client):
+    """Call the app in-process over ASGI, with the same isolated dirs as ``client``."""
+    async def _call(method, url, json=None):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.request(method, url, json=json)
+    return _call
 
 
 # ---------------------------------------------------------------------------
@@ -46,7 +62,14 @@ class TestStatus:
         data = resp.json()
         assert "latex_available" in data
         assert "template_count" in data
-        assert isinstance(data["template_count"], int)
+
+    def test_status_reports_count_once_catalog_loaded(self, client, catalog):
+        data = client.get("/api/status").json()
+        assert data["template_count"] == catalog.component_count()
+
+    def test_status_does_not_wait_for_catalog(self, client, monkeypatch):
+        monkeypatch.setattr(main, "peek_catalog", lambda: None)
+        assert client.get("/api/status").json()["template_count"] is None
 
 
 # ---------------------------------------------------------------------------
@@ -107,11 +130,33 @@ class TestLoadSave:
         assert resp.json()["ok"] is True
         assert (main.PROJECT_DIR / "scene.py").read_text() == "test code"
 
+    def test_non_ascii_round_trip(self, client):
+        sb = {"text": "état |ψ⟩ = α|0⟩ + β|1⟩"}
+        scene = 'label = Text("ψ and é")\n'
+        resp = client.post("/api/save", json={"storyboard_json": sb, "scene_code": scene})
+        assert resp.status_code == 200
+        # Written as UTF-8 bytes, independent of the platform locale
+        assert (main.PROJECT_DIR / "scene.py").read_bytes() == scene.encode("utf-8")
+        assert "ψ".encode("utf-8") in (main.PROJECT_DIR / "storyboard.tldr.json").read_bytes()
+
+        data = client.get("/api/load").json()
+        assert data["storyboard_json"] == sb
+        assert data["scene_code"] == scene
+
+    def test_load_locale_encoded_files(self, client, monkeypatch):
+        monkeypatch.setattr(main.locale, "getpreferredencoding", lambda do_setlocale=True: "cp1252")
+        (main.PROJECT_DIR / "storyboard.tldr.json").write_bytes('{"text": "café"}'.encode("cp1252"))
+        (main.PROJECT_DIR / "scene.py").write_bytes('# café\n'.encode("cp1252"))
+
+        data = client.get("/api/load").json()
+        assert data["storyboard_json"] == {"text": "café"}
+        assert data["scene_code"] == "# café\n"
+
     def test_save_storyboard_json(self, client):
         sb = {"pages": [1, 2, 3]}
         resp = client.post("/api/save", json={"storyboard_json": sb})
         assert resp.status_code == 200
-        saved = json.loads((main.PROJECT_DIR / "storyboard.tldr.json").read_text())
+        saved = orjson.loads((main.PROJECT_DIR / "storyboard.tldr.json").read_bytes())
         assert saved == sb
 
     def test_save_both(self, client):
@@ -129,16 +174,135 @@ class TestLoadSave:
 
 
 class TestGenerate:
-    def test_generate_no_api_key(self, client):
-        with patch.dict("os.environ", {"ANTHROPIC_API_KEY": ""}, clear=False):
-            resp = client.post(
-                "/api/generate",
-                json={"prompt": "test", "images": [{"name": "f", "base64": "abc"}]},
-            )
-            assert resp.status_code == 200
-            data = resp.json()
-            assert data["ok"] is False
-            assert "not configured" in data["error"].lower()
+    def test_generate_no_api_key(self, client, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "")
+        resp = client.post(
+            "/api/generate",
+            json={"prompt": "test", "images": [{"name": "f", "base64": "abc"}]},
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["ok"] is False
+        assert "not configured" in data["error"].lower()
+
+    def test_generate_rejects_invalid_base64(self, client, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        resp = client.post(
+            "/api/generate",
+            json={"images": [{"name": "f", "base64": "data:image/png;base64,abc"}]},
+        )
+        data = resp.json()
+        assert data["ok"] is False
+        assert "base64" in data["error"]
+
+    def test_generate_rejects_truncated_base64(self, client, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        resp = client.post("/api/generate", json={"images": [{"name": "f", "base64": "abc"}]})
+        assert "base64" in resp.json()["error"]
+
+    def test_generate_no_images(self, client, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        resp = client.post("/api/generate", json={"prompt": "test"})
+        assert resp.json()["error"] == "No images provided."
+
+
+class TestGenerateStream:
+    def _events(self, resp):
+        return [
+            orjson.loads(line[len("data: "):])
+            for line in resp.text.splitlines()
+            if line.startswith("data: ")
+        ]
+
+    def test_stream_no_api_key(self, client, monkeypatch):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "")
+        resp = client.post(
+            "/api/generate/stream",
+            json={"prompt": "test", "images": [{"name": "f", "base64": "abc"}]},
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = self._events(resp)
+        assert len(events) == 1
+        assert events[0]["type"] == "result"
+        assert events[0]["ok"] is False
+        assert "not configured" in events[0]["error"].lower()
+
+    def test_chat_stream_emits_deltas_then_code(self, client, monkeypatch):
+        fake_client = MagicMock()
+        stream = fake_client.messages.stream.return_value.__enter__.return_value
+        stream.text_stream = iter(["```python\n", "x = 1", "\n```"])
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        monkeypatch.setattr(main, "_get_client", lambda api_key: fake_client)
+        resp = client.post(
+            "/api/chat/stream",
+            json={"messages": [{"role": "user", "content": "hi"}]},
+        )
+        events = self._events(resp)
+        assert [e["text"] for e in events if e["type"] == "delta"] == ["```python\n", "x = 1", "\n```"]
+        assert events[-1] == {"type": "result", "ok": True, "code": "x = 1", "error": None}
+
+
+# ---------------------------------------------------------------------------
+# Render (streamed)
+# ---------------------------------------------------------------------------
+
+
+FAKE_MANIM = """#!/bin/sh
+echo "Rendering GeneratedScene"
+mkdir -p media/videos/scene/480p15
+printf fake > media/videos/scene/480p15/GeneratedScene.mp4
+"""
+
+
+class TestRenderStream:
+    @pytest.fixture()
+    def fake_manim(self, tmp_path, monkeypatch):
+        """Stand in for `python -m manim`: log a line and drop an MP4 in place."""
+        script = tmp_path / "fake-python"
+        script.write_text(FAKE_MANIM)
+        script.chmod(0o755)
+        monkeypatch.setattr(main.sys, "executable", str(script))
+
+    def test_streams_log_then_saves_render(self, client, fake_manim):
+        slots = main.RENDER_SEMAPHORE._value
+        resp = client.post("/api/render/stream", json={"scene_code": "x = 1", "quality": "l"})
+        events = [
+            orjson.loads(line[len("data: "):])
+            for line in resp.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        assert {"type": "log", "line": "Rendering GeneratedScene"} in events
+        result = events[-1]
+        assert result["type"] == "result"
+        assert result["ok"] is True
+        assert (main.RENDERS_DIR / f"{result['render_id']}.mp4").read_bytes() == b"fake"
+        assert (main.PROJECT_DIR / "render.mp4").exists()
+        assert main.RENDER_SEMAPHORE._value == slots
+
+    def test_render_endpoint_saves_render(self, client, fake_manim):
+        resp = client.post("/api/render", json={"scene_code": "x = 1", "quality": "l"})
+        data = resp.json()
+        assert data["ok"] is True
+        assert (main.RENDERS_DIR / f"{data['render_id']}.mp4").exists()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_render_kills_manim(self, client, tmp_path, monkeypatch):
+        pid_file = tmp_path / "manim.pid"
+        script = tmp_path / "slow-python"
+        script.write_text(f"#!/bin/sh\necho $$ > {pid_file}\nexec sleep 30\n")
+        script.chmod(0o755)
+        monkeypatch.setattr(main.sys, "executable", str(script))
+
+        task = asyncio.ensure_future(main.render_scene(main.RenderRequest(scene_code="x = 1")))
+        while not pid_file.exists() or not pid_file.read_text().strip():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        with pytest.raises(ProcessLookupError):
+            os.kill(int(pid_file.read_text()), 0)
 
 
 # ---------------------------------------------------------------------------
@@ -155,16 +319,11 @@ class TestRenders:
     def _seed_render(self, render_id="test-id-1", name="Render 1", quality="l"):
         """Helper to seed a render entry + dummy mp4."""
         main.RENDERS_DIR.mkdir(parents=True, exist_ok=True)
-        renders = [
-            {
-                "id": render_id,
-                "name": name,
-                "created_at": "2025-01-01T00:00:00+00:00",
-                "quality": quality,
-            }
-        ]
-        main.RENDERS_INDEX_PATH.write_text(json.dumps(renders))
-        (main.RENDERS_DIR / f"{render_id}.mp4").write_bytes(b"\x00" * 100)
+        main.RENDERS_INDEX_PATH.write_bytes(
+            _RENDER_INDEX_TEMPLATE
+            % (render_id.encode(), name.encode(), quality.encode())
+        )
+        (main.RENDERS_DIR / f"{render_id}.mp4").write_bytes(_DUMMY_MP4)
         return render_id
 
     def test_list_renders_with_entry(self, client):
@@ -182,7 +341,7 @@ class TestRenders:
         assert resp.json()["ok"] is True
 
         # Verify persisted
-        renders = json.loads(main.RENDERS_INDEX_PATH.read_text())
+        renders = main.load_renders_index()
         assert renders[0]["name"] == "New Name"
 
     def test_rename_render_not_found(self, client):
@@ -201,7 +360,7 @@ class TestRenders:
         # Verify file deleted
         assert not video_path.exists()
         # Verify removed from index
-        renders = json.loads(main.RENDERS_INDEX_PATH.read_text())
+        renders = main.load_renders_index()
         assert len(renders) == 0
 
     def test_delete_render_not_found(self, client):
@@ -225,12 +384,15 @@ class TestRenders:
 
 
 class TestStitch:
-    def test_stitch_too_few_ids(self, client):
-        resp = client.post("/api/renders/stitch", json={"render_ids": ["one"]})
+    @pytest.mark.asyncio
+    async def test_stitch_too_few_ids(self, acall):
+        resp = await acall("POST", "/api/renders/stitch", json={"render_ids": ["one"]})
         assert resp.status_code == 400
 
-    def test_stitch_missing_render_id(self, client):
-        resp = client.post(
+    @pytest.mark.asyncio
+    async def test_stitch_missing_render_id(self, acall):
+        resp = await acall(
+            "POST",
             "/api/renders/stitch",
             json={"render_ids": ["missing1", "missing2"]},
         )
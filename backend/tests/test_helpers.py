@@ -1,16 +1,13 @@
 """Tests for helper functions in main.py."""
 
-from unittest.mock import patch
+import os
+import stat
 
+import anthropic
 import pytest
 
-import sys
-from pathlib import Path
-
-# Add backend to path so we can import main
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-
-from main import extract_code_from_response, build_system_prompt, detect_latex
+import main
+from main import extract_code_from_response, build_system_prompt, detect_latex, scan_for_latex, _get_client
 
 
 # ---------------------------------------------------------------------------
@@ -50,41 +47,70 @@ class TestExtractCode:
         text = '```python\n```'
         assert extract_code_from_response(text) == ""
 
+    def test_unterminated_fence_returns_text(self):
+        text = "```python\nx = 1" + " " * 10_000
+        assert extract_code_from_response(text) == "```python\nx = 1"
+
 
 # ---------------------------------------------------------------------------
 # build_system_prompt
 # ---------------------------------------------------------------------------
 
 
+def _prompt_text(blocks: list[dict]) -> str:
+    return "".join(block["text"] for block in blocks)
+
+
 class TestBuildSystemPrompt:
     def test_latex_enabled(self):
-        prompt = build_system_prompt(latex_available=True)
+        prompt = _prompt_text(build_system_prompt(latex_available=True))
         assert "MathTex" in prompt
         assert "LaTeX IS available" in prompt
 
     def test_latex_disabled(self):
-        prompt = build_system_prompt(latex_available=False)
+        prompt = _prompt_text(build_system_prompt(latex_available=False))
         assert "LaTeX is NOT available" in prompt
         assert "Text()" in prompt
 
-    def test_with_selected_components(self):
-        prompt = build_system_prompt(
+    def test_with_selected_components(self, hadamard):
+        prompt = _prompt_text(build_system_prompt(
             latex_available=False,
             selected_components=["Hadamard"],
-        )
+        ))
         # If Hadamard exists in catalog, its source should be in the prompt
-        from templates import catalog
-        hadamard = catalog.get_by_name("Hadamard")
         if hadamard:
             assert "AVAILABLE COMPONENT LIBRARY" in prompt
             assert "Hadamard" in prompt
 
-    def test_without_components_includes_summary(self):
-        prompt = build_system_prompt(latex_available=False, selected_components=None)
-        from templates import catalog
+    def test_without_components_includes_summary(self, catalog):
+        prompt = _prompt_text(build_system_prompt(latex_available=False, selected_components=None))
         if catalog.get_components():
             assert "AVAILABLE COMPONENTS" in prompt or "AVAILABLE COMPONENT LIBRARY" in prompt
 
+    def test_blocks_marked_for_prompt_caching(self):
+        blocks = build_system_prompt(latex_available=False)
+        assert all(block["type"] == "text" for block in blocks)
+        assert blocks[-1]["cache_control"] == {"type": "ephemeral"}
+        assert blocks[-1]["text"].rstrip().endswith("just the code.")
+
+    def test_same_selection_gives_identical_payload(self):
+        a = build_system_prompt(latex_available=False, selected_components=["Cnot", "Hadamard"])
+        b = build_system_prompt(latex_available=False, selected_components=["Hadamard", "Cnot"])
+        assert a == b
+        assert a[1]["text"] is b[1]["text"]
+
+    def test_repeated_selection_hits_cache(self):
+        build_system_prompt(latex_available=True, selected_components=["Hadamard"])
+        hits = main._build_system_prompt_cached.cache_info().hits
+        build_system_prompt(latex_available=True, selected_components=("Hadamard",))
+        assert main._build_system_prompt_cached.cache_info().hits == hits + 1
+
+    def test_static_prefix_shared_across_requests(self):
+        a = build_system_prompt(latex_available=True)
+        b = build_system_prompt(latex_available=False, selected_components=["Hadamard"])
+        assert a[0]["text"] == b[0]["text"]
+        assert "LaTeX" not in a[0]["text"].split("AVAILABLE COMPONENTS")[0]
+
 
 # ---------------------------------------------------------------------------
 # detect_latex
@@ -92,11 +118,118 @@ class TestBuildSystemPrompt:
 
 
 class TestDetectLatex:
-    @patch("shutil.which", return_value="/usr/bin/pdflatex")
-    def test_returns_true_when_found(self, mock_which):
-        assert detect_latex() is True
+    def test_returns_true_when_found(self):
+        assert scan_for_latex(which=lambda cmd: f"/usr/bin/{cmd}") is True
 
-    @patch("shutil.which", return_value=None)
-    @patch("pathlib.Path.exists", return_value=False)
-    def test_returns_false_when_not_found(self, mock_exists, mock_which):
+    def test_returns_true_for_known_tex_dir(self):
+        found = scan_for_latex(
+            which=lambda cmd: None,
+            exists=lambda path: path == "/Library/TeX/texbin/pdflatex",
+        )
+        assert found is True
+
+    def test_returns_false_when_not_found(self):
+        assert scan_for_latex(which=lambda cmd: None, exists=lambda path: False) is False
+
+    def test_detect_latex_rescans_each_call(self, monkeypatch):
+        monkeypatch.setattr(main, "scan_for_latex", lambda: True)
+        assert detect_latex() is True
+        monkeypatch.setattr(main, "scan_for_latex", lambda: False)
         assert detect_latex() is False
+
+
+# ---------------------------------------------------------------------------
+# write_text_atomic
+# ---------------------------------------------------------------------------
+
+
+class TestWriteTextAtomic:
+    def test_replaces_existing_file(self, tmp_path):
+        target = tmp_path / "scene.py"
+        target.write_text("old")
+        main.write_text_atomic(target, "new")
+        assert target.read_text() == "new"
+        assert list(tmp_path.iterdir()) == [target]
+
+    def test_new_file_gets_umask_mode(self, tmp_path):
+        target = tmp_path / "scene.py"
+        main.write_text_atomic(target, "new")
+        umask = os.umask(0)
+        os.umask(umask)
+        assert stat.S_IMODE(target.stat().st_mode) == 0o666 & ~umask
+
+    def test_keeps_existing_file_mode(self, tmp_path):
+        target = tmp_path / "scene.py"
+        target.write_text("old")
+        target.chmod(0o640)
+        main.write_text_atomic(target, "new")
+        assert stat.S_IMODE(target.stat().st_mode) == 0o640
+
+    def test_failed_replace_removes_temp_file(self, tmp_path, monkeypatch):
+        target = tmp_path / "scene.py"
+        target.write_text("old")
+
+        def fail_replace(src, dst):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(main.os, "replace", fail_replace)
+        with pytest.raises(OSError):
+            main.write_text_atomic(target, "new")
+        assert target.read_text() == "old"
+        assert list(tmp_path.iterdir()) == [target]
+
+
+# ---------------------------------------------------------------------------
+# find_rendered_mp4
+# ---------------------------------------------------------------------------
+
+
+class TestFindRenderedMp4:
+    def _write_video(self, project_dir, quality_dir):
+        video = project_dir / "media" / "videos" / "scene" / quality_dir / "GeneratedScene.mp4"
+        video.parent.mkdir(parents=True)
+        video.write_bytes(b"\x00")
+        return video
+
+    def test_expected_quality_path(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(main, "PROJECT_DIR", tmp_path)
+        video = self._write_video(tmp_path, "720p30")
+        assert main.find_rendered_mp4(tmp_path / "scene.py", "m") == video
+
+    def test_unknown_quality_scans_resolution_dirs(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(main, "PROJECT_DIR", tmp_path)
+        video = self._write_video(tmp_path, "1440p60")
+        assert main.find_rendered_mp4(tmp_path / "scene.py", "x") == video
+
+    def test_missing_output_returns_none(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(main, "PROJECT_DIR", tmp_path)
+        assert main.find_rendered_mp4(tmp_path / "scene.py", "l") is None
+
+    def test_finish_render_publishes_video(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(main, "PROJECT_DIR", tmp_path)
+        monkeypatch.setattr(main, "RENDERS_DIR", tmp_path / "renders")
+        monkeypatch.setattr(main, "RENDERS_INDEX_PATH", tmp_path / "renders.json")
+        self._write_video(tmp_path, "480p15")
+        result = main._finish_render(tmp_path / "scene.py", "l", 0, "log")
+        assert result["ok"] is True
+        assert (tmp_path / "render.mp4").exists()
+        assert (tmp_path / "renders" / f"{result['render_id']}.mp4").exists()
+        assert (tmp_path / "render.log").read_text() == "log"
+
+
+# ---------------------------------------------------------------------------
+# _get_client
+# ---------------------------------------------------------------------------
+
+
+class TestGetClient:
+    def test_reuses_client_for_same_key(self):
+        assert _get_client("test-key-a") is _get_client("test-key-a")
+
+    def test_separate_client_per_key(self):
+        assert _get_client("test-key-a") is not _get_client("test-key-b")
+
+    def test_keeps_sdk_read_timeout(self):
+        timeout = _get_client("test-key-a").timeout
+        assert timeout.read == anthropic.DEFAULT_TIMEOUT.read
+        assert timeout.connect == 10.0
@@ -1,21 +1,18 @@
 """Tests for template extraction and catalog in templates.py."""
 
-import json
 import tempfile
-from pathlib import Path
 
 import pytest
 
-import sys
-
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-
 from templates import (
+    _extract_cell_classes,
     _extract_code_cells,
     _extract_classes_from_source,
     _find_component_cell,
+    _parse_cells,
+    _parse_source,
     TemplateCatalog,
-    catalog,
+    get_catalog,
 )
 
 
@@ -25,56 +22,24 @@ from templates import (
 
 
 class TestExtractCodeCells:
-    def test_extracts_code_cells_only(self, tmp_path):
-        nb = {
-            "cells": [
-                {"cell_type": "markdown", "source": ["# Title"]},
-                {"cell_type": "code", "source": ["print('hello')"]},
-                {"cell_type": "code", "source": ["# empty stripped"], "outputs": []},
-                {"cell_type": "markdown", "source": ["Some text"]},
-                {"cell_type": "code", "source": ["x = 1"]},
-            ],
-            "metadata": {},
-            "nbformat": 4,
-            "nbformat_minor": 4,
-        }
-        nb_path = tmp_path / "test.ipynb"
-        nb_path.write_text(json.dumps(nb))
-        cells = _extract_code_cells(nb_path)
+    def test_extracts_code_cells_only(self, sample_notebooks):
+        cells = list(_extract_code_cells(sample_notebooks["mixed"]))
         assert len(cells) == 3
         assert cells[0] == "print('hello')"
 
-    def test_handles_string_source(self, tmp_path):
-        nb = {
-            "cells": [
-                {"cell_type": "code", "source": "single_string_source"},
-            ],
-            "metadata": {},
-            "nbformat": 4,
-            "nbformat_minor": 4,
-        }
-        nb_path = tmp_path / "test.ipynb"
-        nb_path.write_text(json.dumps(nb))
-        cells = _extract_code_cells(nb_path)
+    def test_handles_string_source(self, sample_notebooks):
+        cells = list(_extract_code_cells(sample_notebooks["string_source"]))
         assert len(cells) == 1
         assert cells[0] == "single_string_source"
 
-    def test_skips_empty_code_cells(self, tmp_path):
-        nb = {
-            "cells": [
-                {"cell_type": "code", "source": [""]},
-                {"cell_type": "code", "source": ["  \n  "]},
-                {"cell_type": "code", "source": ["real code"]},
-            ],
-            "metadata": {},
-            "nbformat": 4,
-            "nbformat_minor": 4,
-        }
-        nb_path = tmp_path / "test.ipynb"
-        nb_path.write_text(json.dumps(nb))
-        cells = _extract_code_cells(nb_path)
+    def test_skips_empty_code_cells(self, sample_notebooks):
+        cells = list(_extract_code_cells(sample_notebooks["empty_cells"]))
         assert len(cells) == 1
 
+    def test_ignores_cell_outputs(self, heavy_notebook):
+        cells = list(_extract_code_cells(heavy_notebook))
+        assert cells == ["class Big(Scene):\n    pass\n"]
+
 
 # ---------------------------------------------------------------------------
 # _extract_classes_from_source
@@ -114,6 +79,20 @@ class TestExtractClassesFromSource:
         assert len(classes) == 1
         assert classes[0].requires_latex is False
 
+    def test_latex_mention_in_docstring_ignored(self):
+        source = 'class S(Scene):\n    """Plain Text, no MathTex."""\n    def construct(self):\n        t = Text("Tex(")\n'
+        classes = _extract_classes_from_source(source, "test_nb")
+        assert classes[0].requires_latex is False
+
+    def test_requires_latex_module_attribute(self):
+        source = 'class S(Scene):\n    def construct(self):\n        t = manim.MathTex("x")\n'
+        classes = _extract_classes_from_source(source, "test_nb")
+        assert classes[0].requires_latex is True
+
+    def test_no_top_level_class_returns_empty(self):
+        source = "def make():\n    class Local(VGroup):\n        pass\n"
+        assert _extract_classes_from_source(source, "test_nb") == []
+
     def test_invalid_syntax_returns_empty(self):
         source = "class Broken(\n"
         classes = _extract_classes_from_source(source, "test_nb")
@@ -131,26 +110,46 @@ class TestExtractClassesFromSource:
         assert len(classes) == 1
         assert classes[0].category == "other"
 
+    def test_parse_source_returns_none_on_syntax_error(self):
+        assert _parse_source("class Broken(:\n") is None
+
 
 # ---------------------------------------------------------------------------
 # _find_component_cell
 # ---------------------------------------------------------------------------
 
 
+def _component_cell(cells: list[str]) -> str | None:
+    return _find_component_cell(_extract_cell_classes(_parse_cells(cells), "test_nb"))
+
+
 class TestFindComponentCell:
     def test_finds_cell_with_most_components(self):
         cell_a = "class A(VGroup):\n    pass\nclass B(VGroup):\n    pass\nclass C(VGroup):\n    pass\n"
         cell_b = "class MyScene(Scene):\n    def construct(self):\n        pass\n"
-        result = _find_component_cell([cell_a, cell_b])
+        result = _component_cell([cell_a, cell_b])
         assert result == cell_a
 
     def test_empty_list_returns_none(self):
         assert _find_component_cell([]) is None
 
+    def test_cells_without_classes_are_not_parsed(self):
+        parsed = _parse_cells(["x = 1\n", "def f():\n    class Inner: pass\n"])
+        assert [tree for _, tree in parsed] == [None, None]
+
+    def test_skips_unparseable_cells(self):
+        cell = "class A(VGroup):\n    pass\n"
+        assert _component_cell(["class Broken(\n", cell]) == cell
+
+    def test_first_of_tied_cells_wins(self):
+        cell_a = "class A(VGroup):\n    pass\n"
+        cell_b = "class B(VGroup):\n    pass\n"
+        assert _component_cell([cell_a, cell_b]) == cell_a
+
     def test_all_scenes_returns_none(self):
         cell = "class S1(Scene):\n    pass\nclass S2(Scene):\n    pass\n"
-        # Scene subclasses are excluded from component count, so best_count stays 0
-        assert _find_component_cell([cell]) is None
+        # Scene subclasses are excluded from component count, so the best score is 0
+        assert _component_cell([cell]) is None
 
 
 # ---------------------------------------------------------------------------
@@ -159,22 +158,25 @@ class TestFindComponentCell:
 
 
 class TestCatalogIntegration:
-    def test_components_not_empty(self):
+    def test_components_not_empty(self, catalog):
         components = catalog.get_components()
         assert len(components) > 0
 
-    def test_get_by_name_hadamard(self):
-        h = catalog.get_by_name("Hadamard")
-        assert h is not None
-        assert h.name == "Hadamard"
-        assert h.is_scene is False
+    def test_counts_match_lists(self, catalog):
+        assert catalog.component_count() == len(catalog.get_components())
+        assert catalog.example_count() == len(catalog.get_examples())
+
+    def test_get_by_name_hadamard(self, hadamard):
+        assert hadamard is not None
+        assert hadamard.name == "Hadamard"
+        assert hadamard.is_scene is False
 
-    def test_get_component_source(self):
+    def test_get_component_source(self, catalog, hadamard):
         source = catalog.get_component_source(["Hadamard"])
         assert len(source) > 0
-        assert "Hadamard" in source
+        assert hadamard.source in source
 
-    def test_get_categories_structure(self):
+    def test_get_categories_structure(self, catalog):
         categories = catalog.get_categories()
         assert isinstance(categories, list)
         assert len(categories) > 0
@@ -184,7 +186,7 @@ class TestCatalogIntegration:
             assert "components" in cat
             assert isinstance(cat["components"], list)
 
-    def test_get_examples_list(self):
+    def test_get_examples_list(self, catalog):
         examples = catalog.get_examples_list()
         assert isinstance(examples, list)
         # We expect at least some example scenes
@@ -193,6 +195,14 @@ class TestCatalogIntegration:
             assert "name" in ex
             assert "requires_latex" in ex
 
-    def test_get_summary_not_empty(self):
+    def test_get_summary_not_empty(self, catalog):
         summary = catalog.get_summary()
         assert len(summary) > 0
+
+    def test_get_component_source_ignores_selection_order(self, catalog):
+        forward = catalog.get_component_source(["Hadamard", "Cnot"])
+        backward = catalog.get_component_source(["Cnot", "Hadamard", "Cnot"])
+        assert forward is backward
+
+    def test_get_catalog_returns_singleton(self, catalog):
+        assert get_catalog() is catalog
@@ -44,11 +44,16 @@ export function useAIGeneration({ editorRef, setStatus, setRenderLog }: UseAIGen
       const componentNames = selectedComponents.size > 0
         ? Array.from(selectedComponents)
         : undefined
-      const result = await api.generate(
+      let received = 0
+      const result = await api.generateStream(
         images,
         generatePrompt,
         selectedModel,
-        componentNames
+        componentNames,
+        (text) => {
+          received += text.length
+          setStatus(`Generating... (${received} chars)`)
+        }
       )
 
       if (!result.ok || !result.code) {
@@ -151,7 +156,11 @@ export function useAIGeneration({ editorRef, setStatus, setRenderLog }: UseAIGen
         ? Array.from(selectedComponents)
         : undefined
 
-      const result = await api.chat(apiMessages, selectedModel, componentNames)
+      let received = 0
+      const result = await api.chatStream(apiMessages, selectedModel, componentNames, (text) => {
+        received += text.length
+        setStatus(`Refining... (${received} chars)`)
+      })
 
       if (!result.ok || !result.code) {
         setRenderLog(result.error ?? 'Unknown error during chat')
@@ -29,7 +29,7 @@ export interface GenerateResponse {
 
 export interface StatusResponse {
   latex_available: boolean
-  template_count: number
+  template_count: number | null
 }
 
 export interface TemplateComponent {
@@ -84,6 +84,64 @@ export interface TemplateSourceResponse {
   is_scene: boolean
 }
 
+async function readCodeStream(
+  res: Response,
+  onDelta?: (text: string) => void
+): Promise<GenerateResponse> {
+  // Errors (e.g. a 422 validation failure) come back as JSON, not SSE
+  if (!res.ok) {
+    let message = `${res.status} ${res.statusText}`
+    try {
+      const body = await res.json()
+      if (body?.detail) {
+        message = typeof body.detail === 'string' ? body.detail : JSON.stringify(body.detail)
+      }
+    } catch {
+      // keep the status line
+    }
+    throw new Error(message)
+  }
+
+  const reader = res.body?.getReader()
+  if (!reader) {
+    return { ok: false, code: null, error: 'No response stream' }
+  }
+
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let finalResult: GenerateResponse | null = null
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+
+    buffer += decoder.decode(value, { stream: true })
+    const lines = buffer.split('\n')
+    buffer = lines.pop() || ''
+
+    for (const line of lines) {
+      if (!line.startsWith('data: ')) continue
+      const payload = line.slice(6)
+      try {
+        const event = JSON.parse(payload)
+        if (event.type === 'delta' && onDelta) {
+          onDelta(event.text)
+        } else if (event.type === 'result') {
+          finalResult = {
+            ok: event.ok,
+            code: event.code,
+            error: event.error,
+          }
+        }
+      } catch {
+        // ignore parse errors
+      }
+    }
+  }
+
+  return finalResult || { ok: false, code: null, error: 'No result received' }
+}
+
 export const api = {
   async load(): Promise<LoadResponse> {
     const res = await fetch(`${API_BASE}/api/load`)
@@ -150,6 +208,44 @@ export const api = {
     return res.json()
   },
 
+  async generateStream(
+    images: FrameImage[],
+    prompt: string,
+    model: string = 'claude-sonnet-4-5-20250929',
+    selectedComponents?: string[],
+    onDelta?: (text: string) => void
+  ): Promise<GenerateResponse> {
+    const res = await fetch(`${API_BASE}/api/generate/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        images,
+        prompt,
+        model,
+        selected_components: selectedComponents?.length ? selectedComponents : null,
+      }),
+    })
+    return readCodeStream(res, onDelta)
+  },
+
+  async chatStream(
+    messages: Array<{ role: string; content: string | Array<Record<string, unknown>> }>,
+    model: string = 'claude-sonnet-4-5-20250929',
+    selectedComponents?: string[],
+    onDelta?: (text: string) => void
+  ): Promise<ChatResponse> {
+    const res = await fetch(`${API_BASE}/api/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        messages,
+        model,
+        selected_components: selectedComponents?.length ? selectedComponents : null,
+      }),
+    })
+    return readCodeStream(res, onDelta)
+  },
+
   async status(): Promise<StatusResponse> {
     const res = await fetch(`${API_BASE}/api/status`)
     return res.json()